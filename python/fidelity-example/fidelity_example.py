@@ -32,7 +32,10 @@ async def main(argv: list[str]) -> None:
     driver = await zd.start()
     page = await driver.get("https://www.fidelity.com/")
     fidelity = Fidelity(lambda expr: page.evaluate(expr, await_promise=True))
-    _ = input("Login to Fidelity, then press Enter: ")
+    # Read stdin in a thread so the event loop keeps servicing the browser.
+    _ = await asyncio.get_running_loop().run_in_executor(
+        None, input, "Login to Fidelity, then press Enter: "
+    )
     ts = await fidelity.get_transactions(
         cast(list[str], args.accounts), cast(date, args.start), cast(date, args.end)
     )
@@ -21,7 +21,7 @@ for t in transactions:
 See [fidelity_example.py](https://github.com/righteffort/finance-helper/python/fidelity-example/fidelity_example.py) for a working example.
 """  # noqa: E501
 
-from .fidelity import Account, Fidelity, FidelityError, Transaction
+from .fidelity import Account, Fidelity, FidelityError, Transaction, TransactionColumns
 
 
-__all__ = ["Transaction", "Account", "Fidelity", "FidelityError"]  # noqa: RUF022
+__all__ = ["Transaction", "TransactionColumns", "Account", "Fidelity", "FidelityError"]  # noqa: RUF022
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import copy
+import functools
 import json
-import re
+import random
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, time, timedelta
 from http import HTTPStatus
 from importlib.resources import files
 from typing import TYPE_CHECKING, Any, TypedDict, cast
@@ -27,11 +30,39 @@ import pystache  # pyright: ignore[reportMissingTypeStubs]
 from pydantic import ValidationError
 
 
+_RENDERER = pystache.Renderer()
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_FIDELITY_ZONE = ZoneInfo("America/New_York")
+_RETRY_STATUSES = frozenset(
+    {
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    }
+)
+_AMOUNT_STRIP = str.maketrans("", "", ",$")
+_MONTHS = {
+    "Jan": 1,
+    "Feb": 2,
+    "Mar": 3,
+    "Apr": 4,
+    "May": 5,
+    "Jun": 6,
+    "Jul": 7,
+    "Aug": 8,
+    "Sep": 9,
+    "Oct": 10,
+    "Nov": 11,
+    "Dec": 12,
+}
+
+
 class FidelityError(Exception):
     """Raised on any error specific to `Fidelity` class."""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Account:
     """Fidelity account."""
 
@@ -41,7 +72,7 @@ class Account:
     """Fidelity account name selected by the account owner."""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Transaction:
     """Fidelity transaction."""
 
@@ -62,24 +93,66 @@ class Transaction:
     """Transaction identifier. Unique for this account. `None` only if pending."""
 
 
+@dataclass(slots=True, frozen=True)
+class TransactionColumns:
+    """Fidelity transactions stored column-wise, one list per `Transaction` field.
+
+    Suited to bulk consumers, e.g. `numpy.asarray(columns.amount, dtype=float)` or
+    `pandas.DataFrame(dataclasses.asdict(columns))`.
+    """
+
+    acct_num: list[str]
+    """Fidelity account numbers."""
+    date: list[date]
+    """Transaction dates. Should be interpreted as midnight America/New_York."""
+    description: list[str]
+    """Transaction descriptions."""
+    pending: list[bool]
+    """True iff transaction is pending."""
+    cash_balance: list[float | None]
+    """Cash balances. See `Transaction.cash_balance`."""
+    amount: list[float | None]
+    """Transaction amounts in dollars. See `Transaction.amount`."""
+    order_number: list[str | None]
+    """Transaction identifiers. See `Transaction.order_number`."""
+
+
 class Fidelity:
     """Retrieve transactions from fidelity.com via browser fetch calls."""
 
     def __init__(
         self,
         evaluator: Callable[[str], Awaitable[Any]],  # pyright: ignore[reportExplicitAny]
+        max_concurrency: int = 4,
+        max_retries: int = 3,
     ) -> None:
         """Initialize new instance.
 
         Args:
             evaluator: async callback that calls evaluate in context of the browser.
+            max_concurrency: maximum number of fetches in flight at once. Must be
+                at least 1.
+            max_retries: number of times to retry a fetch that fails with a
+                rate-limit or transient server error, with exponential back-off.
+                Must be at least 0.
+
+        Raises:
+            ValueError: if max_concurrency < 1 or max_retries < 0.
 
         """
-        self._accounts: dict[str, Account] | None = None
+        if max_concurrency < 1:
+            msg = f"max_concurrency must be at least 1, got {max_concurrency}"
+            raise ValueError(msg)
+        if max_retries < 0:
+            msg = f"max_retries must be at least 0, got {max_retries}"
+            raise ValueError(msg)
+        self._accounts_task: asyncio.Task[dict[str, Account]] | None = None
         self._evaluator = evaluator
+        self._fetch_semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_retries = max_retries
 
     async def get_transactions(
-        self, accounts: list[str], start: date, end: date
+        self, accounts: list[str], start: date, end: date, chunk_size: int = 8
     ) -> list[Transaction]:
         """Retrieve transactions for the logged in user.
 
@@ -87,35 +160,61 @@ class Fidelity:
             accounts: list of Fidelity account numbers to retrieve.
             start: start date, inclusive. Treated as midnight America/New_York.
             end: end date, inclusive. Treated as midnight America/New_York.
+            chunk_size: maximum number of accounts per fetch. Chunks are fetched
+                concurrently.
 
         Returns:
-            Transactions for accounts between [start, end].
+            Transactions for accounts between [start, end], in Fidelity's order
+            within each chunk of accounts.
+
+        Note: cash_balance not returned for accounts fetched in a chunk of more
+        than one account.
 
-        Note: cash_balance not returned if len(accounts) > 1
+        Note: the first call on an instance also fetches the user's accounts, since
+        the request needs each account's name. Accounts are cached for the life of
+        the instance, so later calls skip the accounts fetch.
 
         Raises:
             FidelityError: if there is any error retrieving the transactions.
+            ValueError: if chunk_size < 1.
 
         """
-        acct_dict = {a: await self._get_account(a) for a in accounts}
-        missing = [a for a, acct in acct_dict.items() if acct is None]
-        if missing:
-            msg = f"Account(s) not found: {', '.join(missing)}"
-            raise FidelityError(msg)
-        accts = [a for a in acct_dict.values() if a is not None]
+        historys = await self._get_historys(accounts, start, end, chunk_size)
+        return [Fidelity._history_entry_to_transaction(h) for h in historys]
+
+    async def get_transactions_columnar(
+        self, accounts: list[str], start: date, end: date, chunk_size: int = 8
+    ) -> TransactionColumns:
+        """Retrieve transactions for the logged in user, stored column-wise.
+
+        Same as `get_transactions`, but returns one list per field without creating
+        a `Transaction` per row.
+
+        Args:
+            accounts: list of Fidelity account numbers to retrieve.
+            start: start date, inclusive. Treated as midnight America/New_York.
+            end: end date, inclusive. Treated as midnight America/New_York.
+            chunk_size: maximum number of accounts per fetch. Chunks are fetched
+                concurrently.
+
+        Returns:
+            Transactions for accounts between [start, end].
 
-        resp_json = await self._fetch(
-            "https://digital.fidelity.com/ftgw/digital/webactivity/api/graphql?ref_at=activity",
-            json.dumps(Fidelity.get_transactions_options(accts, start, end)),
+        Raises:
+            FidelityError: if there is any error retrieving the transactions.
+            ValueError: if chunk_size < 1.
+
+        """
+        historys = await self._get_historys(accounts, start, end, chunk_size)
+        return TransactionColumns(
+            acct_num=[h.acctNum for h in historys],
+            date=[Fidelity._date_string_to_date(h.date) for h in historys],
+            description=[h.description for h in historys],
+            pending=[h.intradayInd for h in historys],
+            cash_balance=[Fidelity._history_entry_cash_balance(h) for h in historys],
+            amount=[Fidelity._history_entry_amount(h) for h in historys],
+            order_number=[h.orderNumber for h in historys],
         )
-        try:
-            historys = GetTransactionsRespModel.model_validate(
-                resp_json
-            ).data.getTransactions.historys
-        except ValidationError as e:
-            msg = "Failed to parse get_transactions response"
-            raise FidelityError(msg) from e
-        return [Fidelity._history_entry_to_transaction(h) for h in historys]
 
     async def get_accounts(self) -> list[Account]:
         """Retrieve accounts for the logged in user.
@@ -144,22 +243,11 @@ class Fidelity:
            JSON-compatible object options argument for fetch call.
 
         """  # noqa: E501
-        context = {
-            "body": json.dumps(
-                Fidelity._get_transactions_body(accounts, start, end).model_dump_json()
-            )
-        }
-        return cast(
-            dict[str, object],
-            json.loads(
-                cast(
-                    str,
-                    pystache.render(  # pyright: ignore[reportUnknownMemberType]
-                        Fidelity._get_transactions_options_template(), context
-                    ),
-                )
-            ),
-        )
+        options = copy.deepcopy(Fidelity._get_transactions_options_base())
+        options["body"] = Fidelity._get_transactions_body(
+            accounts, start, end
+        ).model_dump_json()
+        return options
 
     @staticmethod
     def get_accounts_options() -> dict[str, object]:
@@ -169,16 +257,7 @@ class Fidelity:
            JSON-compatible object options argument for fetch call.
 
         """  # noqa: E501
-        return cast(
-            dict[str, object],
-            json.loads(
-                files("fidelity_helper")
-                .joinpath("fidelity-templates/getAccountsOptions.json")
-                .read_text()
-            ),
-        )
-
-    _FIDELITY_ZONE = ZoneInfo("America/New_York")
+        return cast(dict[str, object], json.loads(Fidelity._get_accounts_options_str()))
 
     @staticmethod
     def fidelity_date(d: date) -> int:
@@ -191,11 +270,7 @@ class Fidelity:
             Epoch seconds for d interpreted as America/New_York at midnight.
 
         """
-        return int(
-            datetime.combine(
-                d, datetime.min.time(), Fidelity._FIDELITY_ZONE
-            ).timestamp()
-        )
+        return _fidelity_date_cached(d)
 
     @staticmethod
     def encode_account_name(name: str) -> str:
@@ -208,7 +283,7 @@ class Fidelity:
             The encoded name.
 
         """
-        return base64.b64encode(name.encode("utf-8")).decode("ascii")
+        return _encode_account_name(name)
 
     @staticmethod
     def print_get_transactions_options(options: dict[str, object]) -> str:
@@ -221,11 +296,9 @@ class Fidelity:
             Printable string with embedded JSON strings parsed into objects.
 
         """
-        options_minus_body = cast(dict[str, object], json.loads(json.dumps(options)))
-        del options_minus_body["body"]
+        options_minus_body = {k: v for k, v in options.items() if k != "body"}
         body = cast(dict[str, object], json.loads(cast(str, options["body"])))
-        body_minus_query = cast(dict[str, object], json.loads(json.dumps(body)))
-        del body_minus_query["query"]
+        body_minus_query = {k: v for k, v in body.items() if k != "query"}
         query = cast(str, body["query"])
         return "\n".join(
             [
@@ -235,43 +308,91 @@ class Fidelity:
             ]
         )
 
-    async def _fetch(self, url: str, options_str: str) -> dict[str, object]:
+    async def _fetch(self, url: str, options_str: str) -> str:
         fetch = f'fetch("{url}", {options_str})'
         script = f"""
         (async () => {{
              const r = await {fetch};
-             if (!r.ok) {{
-                 return {{ status: r.status, text: await r.text() }}
-             }}
-             const json = await r.json()
-             return {{ status: r.status, json: json }};
+             return {{ status: r.status, text: await r.text() }};
         }})()
         """
-        resp = cast(_FetchResp, await self._evaluator(script))
-        if resp["status"] != HTTPStatus.OK:
-            msg = (
-                "get_transactions fetch failed, code: ",
-                f"{resp['status']}, text: {resp.get('text')}",
-            )
+        attempt = 0
+        while True:
+            async with self._fetch_semaphore:
+                resp = cast(_FetchResp, await self._evaluator(script))
+            if resp["status"] == HTTPStatus.OK:
+                return resp["text"]
+            if resp["status"] not in _RETRY_STATUSES or attempt >= self._max_retries:
+                msg = f"fetch failed, code: {resp['status']}, text: {resp['text']}"
+                raise FidelityError(msg)
+            await asyncio.sleep(2.0**attempt + random.random())  # noqa: S311
+            attempt += 1
+
+    async def _get_historys(
+        self, accounts: list[str], start: date, end: date, chunk_size: int
+    ) -> list[GetTransactionsRespHistoryModel]:
+        if chunk_size < 1:
+            msg = f"chunk_size must be at least 1, got {chunk_size}"
+            raise ValueError(msg)
+        results = await asyncio.gather(*(self._get_account(a) for a in accounts))
+        acct_dict = dict(zip(accounts, results, strict=True))
+        missing = [a for a, acct in acct_dict.items() if acct is None]
+        if missing:
+            msg = f"Account(s) not found: {', '.join(missing)}"
             raise FidelityError(msg)
-        return resp["json"]
+        accts = [a for a in acct_dict.values() if a is not None]
+        # Always make at least one fetch, even for an empty account list.
+        chunks = [
+            accts[i : i + chunk_size] for i in range(0, max(len(accts), 1), chunk_size)
+        ]
+
+        resp_texts = await asyncio.gather(
+            *(
+                self._fetch(
+                    "https://digital.fidelity.com/ftgw/digital/webactivity/api/graphql?ref_at=activity",
+                    json.dumps(Fidelity.get_transactions_options(chunk, start, end)),
+                )
+                for chunk in chunks
+            )
+        )
+        try:
+            historys = [
+                h
+                for resp_text in resp_texts
+                for h in GetTransactionsRespModel.model_validate_json(
+                    resp_text
+                ).data.getTransactions.historys
+            ]
+        except ValidationError as e:
+            msg = "Failed to parse get_transactions response"
+            raise FidelityError(msg) from e
+        return historys
 
     async def _get_account(self, account: str) -> Account | None:
         return (await self._get_accounts()).get(account, None)
 
     async def _get_accounts(self) -> dict[str, Account]:
-        if self._accounts is not None:
-            return self._accounts
-        self._accounts = await self._fetch_accounts()
-        return self._accounts
+        # Concurrent callers share a single in-flight fetch.
+        if self._accounts_task is None:
+            self._accounts_task = asyncio.create_task(self._fetch_accounts())
+            self._accounts_task.add_done_callback(self._accounts_task_done)
+        return await asyncio.shield(self._accounts_task)
+
+    def _accounts_task_done(self, task: asyncio.Task[dict[str, Account]]) -> None:
+        # Don't cache failures, even if no caller is left waiting on the task;
+        # the next caller fetches again.
+        if (task.cancelled() or task.exception() is not None) and (
+            self._accounts_task is task
+        ):
+            self._accounts_task = None
 
     async def _fetch_accounts(self) -> dict[str, Account]:
-        resp_json = await self._fetch(
+        resp_text = await self._fetch(
             "https://digital.fidelity.com/ftgw/digital/portfolio/api/graphql?ref_at=portsum",
-            json.dumps(Fidelity.get_accounts_options()),
+            Fidelity._get_accounts_options_str(),
         )
         try:
-            resp = GetAccountsRespModel.model_validate(resp_json).data.getContext
+            resp = GetAccountsRespModel.model_validate_json(resp_text).data.getContext
         except ValidationError as e:
             msg = "Failed to parse get_accounts response"
             raise FidelityError(msg) from e
@@ -289,74 +410,120 @@ class Fidelity:
     def _get_transactions_body(
         accounts: list[Account], start: date, end: date
     ) -> GetTransactionsReqModel:
-        account_dicts: list[dict[str, str | bool]] = [
-            {
-                "number": a.number,
-                "name": Fidelity.encode_account_name(a.name),
-                "last": i == len(accounts) - 1,
+        base = Fidelity._get_transactions_body_base()
+        base_vars = base.variables
+        variables = base_vars.model_copy(
+            update={
+                "acctIdList": ",".join(a.number for a in accounts),
+                "acctDetailList": [
+                    base_vars.acctDetailList[0].model_copy(
+                        update={
+                            "acctNum": a.number,
+                            "name": Fidelity.encode_account_name(a.name),
+                        }
+                    )
+                    for a in accounts
+                ],
+                "searchCriteriaDetail": base_vars.searchCriteriaDetail.model_copy(
+                    update={
+                        "txnFromDate": str(Fidelity.fidelity_date(start)),
+                        "txnToDate": str(Fidelity.fidelity_date(end)),
+                    }
+                ),
             }
-            for i, a in enumerate(accounts)
-        ]
+        )
+        return base.model_copy(update={"variables": variables})
+
+    @staticmethod
+    @functools.cache
+    def _get_accounts_options_str() -> str:
+        return Fidelity._read_template("getAccountsOptions.json")
+
+    @staticmethod
+    @functools.cache
+    def _get_transactions_body_base() -> GetTransactionsReqModel:
+        # Render the template once with a single placeholder account.
+        # _get_transactions_body fills in the per-request fields.
         context = {
-            "accounts": account_dicts,
-            "start": str(Fidelity.fidelity_date(start)),
-            "end": str(Fidelity.fidelity_date(end)),
+            "accounts": [{"number": "", "name": "", "last": True}],
+            "start": "",
+            "end": "",
         }
         body = cast(
             str,
-            pystache.render(Fidelity._get_transactions_body_template(), context),  # pyright: ignore[reportUnknownMemberType]
+            _RENDERER.render(  # pyright: ignore[reportUnknownMemberType]
+                Fidelity._read_template("getTransactionsBody.json.mustache"), context
+            ),
         )
         return GetTransactionsReqModel.model_validate_json(body)
 
     @staticmethod
-    def _get_transactions_body_template() -> str:
-        return (
-            files("fidelity_helper")
-            .joinpath("fidelity-templates/getTransactionsBody.json.mustache")
-            .read_text()
+    @functools.cache
+    def _get_transactions_options_base() -> dict[str, object]:
+        # Everything but the body is static, so render the template once.
+        return cast(
+            dict[str, object],
+            json.loads(
+                cast(
+                    str,
+                    _RENDERER.render(  # pyright: ignore[reportUnknownMemberType]
+                        Fidelity._read_template("getTransactionsOptions.json.mustache"),
+                        {"body": "null"},
+                    ),
+                )
+            ),
         )
 
     @staticmethod
-    def _get_transactions_options_template() -> str:
+    def _read_template(name: str) -> str:
         return (
-            files("fidelity_helper")
-            .joinpath("fidelity-templates/getTransactionsOptions.json.mustache")
-            .read_text()
+            files("fidelity_helper").joinpath(f"fidelity-templates/{name}").read_text()
         )
 
     @staticmethod
     def _history_entry_to_transaction(
         h: GetTransactionsRespHistoryModel,
     ) -> Transaction:
-        pending = bool(h.intradayInd)
-        if not pending:
-            amount = Fidelity._amount_string_to_float_allow_dash_dash(h.amount)
-        else:
-            amount = Fidelity._amount_string_to_float(h.amount)
-        if amount is None and not pending:
-            msg = f"Unexpected amount string {h.amount} in history entry {h}"
-            raise FidelityError(msg)
-        cash_balance = (
-            Fidelity._amount_string_to_float(h.cashBalance)
-            if h.cashBalance is not None
-            else None
-        )
         return Transaction(
             acct_num=h.acctNum,
-            cash_balance=cash_balance,
-            date=datetime.strptime(h.date, "%b-%d-%Y").date(),
+            cash_balance=Fidelity._history_entry_cash_balance(h),
+            date=Fidelity._date_string_to_date(h.date),
             description=h.description,
-            amount=amount,
+            amount=Fidelity._history_entry_amount(h),
             order_number=h.orderNumber,
-            pending=pending,
+            pending=h.intradayInd,
         )
 
+    @staticmethod
+    def _history_entry_amount(h: GetTransactionsRespHistoryModel) -> float | None:
+        if h.intradayInd:
+            return Fidelity._amount_string_to_float(h.amount)
+        amount = Fidelity._amount_string_to_float_allow_dash_dash(h.amount)
+        if amount is None:
+            msg = f"Unexpected amount string {h.amount} in history entry {h}"
+            raise FidelityError(msg)
+        return amount
+
+    @staticmethod
+    def _history_entry_cash_balance(h: GetTransactionsRespHistoryModel) -> float | None:
+        return Fidelity._amount_string_to_float(h.cashBalance)
+
+    @staticmethod
+    def _date_string_to_date(s: str) -> date:
+        # Equivalent to datetime.strptime(s, "%b-%d-%Y").date(), but much faster.
+        try:
+            mmm, dd, yyyy = s.split("-")
+            return date(int(yyyy), _MONTHS[mmm], int(dd))
+        except (KeyError, ValueError) as e:
+            msg = f"Unexpected date string {s}"
+            raise FidelityError(msg) from e
+
     @staticmethod
     def _amount_string_to_float(s: str | None) -> float | None:
         if s is None:
             return None
         try:
-            return round(float(re.sub(r"[,$]", r"", s)), 2)
+            return round(float(s.translate(_AMOUNT_STRIP)), 2)
         except ValueError:
             return None
 
@@ -365,7 +532,19 @@ class Fidelity:
         return 0.0 if s == "--" else Fidelity._amount_string_to_float(s)
 
 
+@functools.lru_cache(maxsize=4096)
+def _fidelity_date_cached(d: date) -> int:
+    # Midnight is never skipped or repeated in America/New_York, so the local
+    # midnight offset applies and no tz-aware timestamp() call is needed.
+    offset = cast(timedelta, _FIDELITY_ZONE.utcoffset(datetime.combine(d, time.min)))
+    return (d.toordinal() - _EPOCH_ORDINAL) * 86400 - int(offset.total_seconds())
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_account_name(name: str) -> str:
+    return base64.b64encode(name.encode("utf-8")).decode("ascii")
+
+
 class _FetchResp(TypedDict):
     status: int
     text: str
-    json: dict[str, Any]  # pyright: ignore[reportExplicitAny]
@@ -1,14 +1,15 @@
+import asyncio
 import json
 from dataclasses import asdict
 from datetime import date
 from pathlib import Path
 from typing import cast
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import aiofiles
 import pytest
 
-from fidelity_helper.fidelity import Account, Fidelity
+from fidelity_helper.fidelity import Account, Fidelity, FidelityError
 from fidelity_helper.fidelity_models import GetTransactionsReqModel
 
 
@@ -20,6 +21,19 @@ def get_suffixes() -> list[str]:
     )
 
 
+START = date(2025, 11, 28)
+END = date(2025, 12, 2)
+
+
+def get_config_accounts(suffix: str) -> list[str]:
+    """Account numbers to request for the given test suffix."""
+    config = cast(
+        dict[str, list[str]],
+        json.loads(Path(f"testdata/config_{suffix}.json").read_text()),
+    )
+    return config["accounts"]
+
+
 class MockEvaluator:
     def __init__(self, suffix: str) -> None:
         self.suffix = suffix
@@ -27,19 +41,23 @@ class MockEvaluator:
     async def __call__(self, code: str) -> object:
         """Helper function to mock fetch responses based on URL in the code."""
         if "ftgw/digital/portfolio/api/graphql?ref_at=portsum" in code:
-            async with aiofiles.open(
+            return await self._read_response(
                 f"testdata/mock_get_accounts_response_{self.suffix}.json"
-            ) as f:
-                content = await f.read()
-                return cast(object, json.loads(content))
-        elif "ftgw/digital/webactivity/api/graphql?ref_at=activity" in code:
-            async with aiofiles.open(
+            )
+        if "ftgw/digital/webactivity/api/graphql?ref_at=activity" in code:
+            return await self._read_response(
                 f"testdata/mock_get_transactions_response_{self.suffix}.json"
-            ) as f:
-                content = await f.read()
-                return cast(object, json.loads(content))
+            )
         pytest.fail(f"Unexpected code in mock_evaluator: {code}")
 
+    @staticmethod
+    async def _read_response(path: str) -> object:
+        """Convert a {status, json} mock response to the {status, text} _fetch gets."""
+        async with aiofiles.open(path) as f:
+            content = await f.read()
+        resp = cast(dict[str, object], json.loads(content))
+        return {"status": resp["status"], "text": json.dumps(resp["json"])}
+
 
 def test_get_transactions_options() -> None:
     accts = [Account(number="1234", name="name1"), Account(number="6789", name="name2")]
@@ -55,22 +73,29 @@ def test_get_transactions_options() -> None:
     assert search_criteria.txnToDate == "1759291200"
 
 
+@pytest.mark.parametrize(
+    ("d", "expected"),
+    [
+        (date(2024, 3, 9), 1709960400),  # day before spring forward
+        (date(2024, 3, 10), 1710046800),  # spring forward at 2am
+        (date(2024, 3, 11), 1710129600),
+        (date(2024, 11, 3), 1730606400),  # fall back at 2am
+        (date(2024, 11, 4), 1730696400),
+    ],
+)
+def test_fidelity_date(d: date, expected: int) -> None:
+    assert Fidelity.fidelity_date(d) == expected
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize("suffix", get_suffixes())
 async def test_get_transactions(suffix: str) -> None:
-    config = cast(
-        dict[str, list[str]],
-        json.loads(Path(f"testdata/config_{suffix}.json").read_text()),
-    )
-
+    accounts = get_config_accounts(suffix)
     mock_evaluator = MockEvaluator(suffix)
     fidelity = Fidelity(mock_evaluator)
-    accounts: list[str] = config["accounts"]
-    start = date(2025, 11, 28)
-    end = date(2025, 12, 2)
 
     with patch.object(fidelity, "_fetch", wraps=fidelity._fetch) as fetch_spy:  # pyright: ignore[reportPrivateUsage]
-        transactions = await fidelity.get_transactions(accounts, start, end)
+        transactions = await fidelity.get_transactions(accounts, START, END)
     assert fetch_spy.call_count == 2
     options = cast(
         dict[str, object], json.loads(cast(str, fetch_spy.call_args_list[1].args[1]))
@@ -95,3 +120,215 @@ async def test_get_transactions(suffix: str) -> None:
         actual.append(d)
 
     assert actual == expected
+
+
+class FailingEvaluator:
+    """Fails the first `failures` calls with `status`, then delegates."""
+
+    def __init__(self, delegate: MockEvaluator, status: int, failures: int) -> None:
+        self.delegate = delegate
+        self.status = status
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, code: str) -> object:
+        self.calls += 1
+        if self.calls <= self.failures:
+            return {"status": self.status, "text": "try again later"}
+        return await self.delegate(code)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("status", "failures", "expected_calls", "expected_sleeps"),
+    [
+        (429, 2, 3, 2),  # retried, then succeeds
+        (503, 4, 4, 3),  # gives up after max_retries
+        (500, 1, 1, 0),  # not retried
+    ],
+)
+async def test_fetch_retries(
+    status: int, failures: int, expected_calls: int, expected_sleeps: int
+) -> None:
+    evaluator = FailingEvaluator(MockEvaluator(get_suffixes()[0]), status, failures)
+    fidelity = Fidelity(evaluator, max_retries=3)
+    with patch("asyncio.sleep", new_callable=AsyncMock) as sleep_mock:
+        if failures < expected_calls:
+            assert await fidelity.get_accounts()
+        else:
+            with pytest.raises(FidelityError, match=f"code: {status}"):
+                _ = await fidelity.get_accounts()
+    assert evaluator.calls == expected_calls
+    assert sleep_mock.await_count == expected_sleeps
+
+
+class PeakTrackingEvaluator:
+    """Records the peak number of concurrent calls, then delegates."""
+
+    def __init__(self, delegate: MockEvaluator) -> None:
+        self.delegate = delegate
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, code: str) -> object:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0)
+            return await self.delegate(code)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("max_concurrency", [1, 4])
+async def test_fetch_concurrency_limit(max_concurrency: int) -> None:
+    suffix = get_suffixes()[0]
+    accounts = get_config_accounts(suffix)
+    evaluator = PeakTrackingEvaluator(MockEvaluator(suffix))
+    fidelity = Fidelity(evaluator, max_concurrency=max_concurrency)
+
+    _ = await fidelity.get_transactions(accounts, START, END, chunk_size=1)
+    assert evaluator.peak == min(max_concurrency, len(accounts))
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "match"),
+    [
+        ({"max_concurrency": 0}, "max_concurrency must be at least 1"),
+        ({"max_concurrency": -1}, "max_concurrency must be at least 1"),
+        ({"max_retries": -1}, "max_retries must be at least 0"),
+    ],
+)
+def test_init_invalid_limits(kwargs: dict[str, int], match: str) -> None:
+    with pytest.raises(ValueError, match=match):
+        _ = Fidelity(MockEvaluator(get_suffixes()[0]), **kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("suffix", get_suffixes())
+async def test_get_transactions_concurrent(suffix: str) -> None:
+    accounts = get_config_accounts(suffix)
+
+    fidelity = Fidelity(MockEvaluator(suffix))
+    fetch_accounts = fidelity._fetch_accounts  # pyright: ignore[reportPrivateUsage]
+    with patch.object(
+        fidelity, "_fetch_accounts", wraps=fetch_accounts
+    ) as fetch_accounts_spy:
+        results = await asyncio.gather(
+            fidelity.get_transactions(accounts, START, END, chunk_size=1),
+            fidelity.get_transactions(accounts, START, END),
+            fidelity.get_accounts(),
+        )
+    assert fetch_accounts_spy.call_count == 1
+    assert results[0] == results[1] * len(accounts)
+
+
+@pytest.mark.asyncio
+async def test_get_accounts_retries_after_failure() -> None:
+    evaluator = FailingEvaluator(MockEvaluator(get_suffixes()[0]), 500, 1)
+    fidelity = Fidelity(evaluator)
+
+    with pytest.raises(FidelityError, match="code: 500"):
+        _ = await fidelity.get_accounts()
+    assert await fidelity.get_accounts()
+    assert evaluator.calls == 2
+
+
+class BlockedFailingEvaluator:
+    """Fails the first call once `release` is set, then delegates."""
+
+    def __init__(self, delegate: MockEvaluator) -> None:
+        self.delegate = delegate
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self, code: str) -> object:
+        self.calls += 1
+        if self.calls == 1:
+            _ = await self.release.wait()
+            return {"status": 500, "text": "server error"}
+        return await self.delegate(code)
+
+
+@pytest.mark.asyncio
+async def test_get_accounts_retries_after_unobserved_failure() -> None:
+    evaluator = BlockedFailingEvaluator(MockEvaluator(get_suffixes()[0]))
+    fidelity = Fidelity(evaluator)
+
+    # The only caller is cancelled while the shared fetch is in flight, so no one
+    # is waiting when the fetch fails.
+    caller = asyncio.create_task(fidelity.get_accounts())
+    await asyncio.sleep(0)
+    _ = caller.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        _ = await caller
+    evaluator.release.set()
+    # Let the shared fetch finish failing.
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+    assert await fidelity.get_accounts()
+    assert evaluator.calls == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("suffix", get_suffixes())
+async def test_get_transactions_chunked(suffix: str) -> None:
+    accounts = get_config_accounts(suffix)
+
+    unchunked = await Fidelity(MockEvaluator(suffix)).get_transactions(
+        accounts, START, END
+    )
+    fidelity = Fidelity(MockEvaluator(suffix))
+    with patch.object(fidelity, "_fetch", wraps=fidelity._fetch) as fetch_spy:  # pyright: ignore[reportPrivateUsage]
+        chunked = await fidelity.get_transactions(accounts, START, END, chunk_size=1)
+
+    assert fetch_spy.call_count == 1 + len(accounts)
+    acct_id_lists: list[str] = []
+    for call in fetch_spy.call_args_list[1:]:
+        options = cast(dict[str, object], json.loads(cast(str, call.args[1])))
+        body = GetTransactionsReqModel.model_validate_json(cast(str, options["body"]))
+        acct_id_lists.append(body.variables.acctIdList)
+    assert acct_id_lists == accounts
+    # The mock returns the same response for every chunk.
+    assert chunked == unchunked * len(accounts)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_size", [0, -1])
+@pytest.mark.parametrize("columnar", [False, True])
+async def test_get_transactions_invalid_chunk_size(
+    chunk_size: int,
+    columnar: bool,  # noqa: FBT001
+) -> None:
+    suffix = get_suffixes()[0]
+    accounts = get_config_accounts(suffix)
+    evaluator = AsyncMock(wraps=MockEvaluator(suffix))
+    fidelity = Fidelity(evaluator)
+    get = fidelity.get_transactions_columnar if columnar else fidelity.get_transactions
+
+    with pytest.raises(ValueError, match="chunk_size must be at least 1"):
+        _ = await get(accounts, START, END, chunk_size=chunk_size)
+    evaluator.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("suffix", get_suffixes())
+async def test_get_transactions_columnar(suffix: str) -> None:
+    accounts = get_config_accounts(suffix)
+
+    transactions = await Fidelity(MockEvaluator(suffix)).get_transactions(
+        accounts, START, END
+    )
+    columns = await Fidelity(MockEvaluator(suffix)).get_transactions_columnar(
+        accounts, START, END
+    )
+
+    assert columns.acct_num == [t.acct_num for t in transactions]
+    assert columns.date == [t.date for t in transactions]
+    assert columns.description == [t.description for t in transactions]
+    assert columns.pending == [t.pending for t in transactions]
+    assert columns.cash_balance == [t.cash_balance for t in transactions]
+    assert columns.amount == [t.amount for t in transactions]
+    assert columns.order_number == [t.order_number for t in transactions]